@@ -1,10 +1,23 @@
 #!/usr/bin/env python3
-import argparse, csv, gzip, os, re, sqlite3, sys
-from typing import List, Optional
+import argparse, csv, gzip, io, os, re, sqlite3, sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+# Latin-1 tekens buiten [A-Za-z0-9_] → '_' in één C-pass; de regex is alleen nog nodig voor exotische tekens
+_IDENT_TABLE = str.maketrans({chr(i): "_" for i in range(256) if not (chr(i).isascii() and (chr(i).isalnum() or chr(i) == "_"))})
+_NONWORD = re.compile(r"[^A-Za-z0-9_]")
+_LEADDIGIT = re.compile(r"^\d")
+
+# Regels per werkpakket bij parallel parsen (~1 MB KNMI-tekst)
+CHUNK_LINES = 5000
 
 def open_text(path: str):
     if path.endswith(".gz"):
-        return gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+        # GzipFile.readline is traag; een grote BufferedReader ertussen scheelt flink
+        raw = io.BufferedReader(gzip.open(path, "rb"), buffer_size=1 << 20)
+        return io.TextIOWrapper(raw, encoding="utf-8", errors="ignore")
     return open(path, "r", encoding="utf-8", errors="ignore")
 
 def sanitize(name: str) -> str:
@@ -12,24 +25,25 @@ def sanitize(name: str) -> str:
     if s.startswith("#"):
         s = s[1:]
     s = s.strip()
-    s = re.sub(r"[^A-Za-z0-9_]", "_", s)
-    if re.match(r"^\d", s):
+    s = s.translate(_IDENT_TABLE)
+    if not s.isascii():
+        s = _NONWORD.sub("_", s)
+    if _LEADDIGIT.match(s):
         s = "_" + s
     return s or "col"
 
-def detect_header_and_data_start(lines: List[str]) -> (List[str], int):
-    header_idx = None
+def find_header(lines: Iterator[str]) -> List[str]:
+    """Consumeer regels tot en met de header; de iterator staat daarna op de eerste dataregel."""
     header_cols = None
-    for i, line in enumerate(lines):
+    for line in lines:
         if line.lstrip().startswith("# STN"):
             # Gebruik de hele regel na '#'
             raw = line.lstrip()[1:].strip()
             header_cols = [c.strip() for c in raw.split(",") if c.strip()]
-            header_idx = i
             break
-    if header_idx is None or not header_cols:
+    if not header_cols:
         raise RuntimeError("Kon de headerregel niet vinden (verwacht iets als: '# STN,YYYYMMDD,...').")
-    return header_cols, header_idx + 1
+    return header_cols
 
 def parse_value(cell: str, nullify_neg9999: bool) -> Optional[int]:
     cell = cell.strip()
@@ -44,6 +58,53 @@ def parse_value(cell: str, nullify_neg9999: bool) -> Optional[int]:
         # Laat evt. strings (zoals datum yyyymmdd) intact als TEXT
         return cell
 
+class CellParser(dict):
+    """Cache cel-tekst → waarde; KNMI-waarden herhalen zich sterk, dus `map(p.__getitem__, row)`
+    blijft voor bijna elke cel in C en roept `parse_value` alleen aan bij een nieuwe waarde."""
+
+    def __init__(self, nullify_neg9999: bool):
+        super().__init__()
+        self.nullify_neg9999 = nullify_neg9999
+
+    def __missing__(self, cell: str):
+        val = self[cell] = parse_value(cell, self.nullify_neg9999)
+        return val
+
+def iter_rows(lines: Iterator[str], ncols: int, parse_cell) -> Iterator[list]:
+    """Yield geparste datarijen (getrimd/gepad tot `ncols`) uit de regels na de header."""
+    data_lines = (ln for ln in lines if ln.strip() and not ln.lstrip().startswith("#"))
+    # Per cel geen Python-code meer: csv splitst in C, `map` + dict-lookup (CellParser) zet om in C.
+    # Strippen is niet nodig; parse_value doet dat alleen bij een nog onbekende celtekst.
+    for row in csv.reader(data_lines, delimiter=","):
+        # trim/pad naar kolomlengte
+        if len(row) < ncols:
+            row += [""] * (ncols - len(row))
+        yield list(map(parse_cell, row[:ncols]))
+
+# Eén CellParser per workerproces (en per -9999-instelling), zodat de cache tussen chunks blijft
+_WORKER_PARSERS: Dict[bool, "CellParser"] = {}
+
+def parse_chunk(lines: List[str], ncols: int, nullify_neg9999: bool) -> List[list]:
+    parser = _WORKER_PARSERS.get(nullify_neg9999)
+    if parser is None:
+        parser = _WORKER_PARSERS[nullify_neg9999] = CellParser(nullify_neg9999)
+    return list(iter_rows(lines, ncols, parser.__getitem__))
+
+def iter_rows_parallel(lines: Iterator[str], ncols: int, nullify_neg9999: bool, workers: int) -> Iterator[list]:
+    """Als `iter_rows`, maar parse chunks van CHUNK_LINES regels in `workers` processen.
+
+    KNMI-regels bevatten geen multi-line velden, dus op regelgrenzen knippen is veilig. Er staan
+    hooguit 2×workers chunks tegelijk uit, zodat het geheugen begrensd blijft en de volgorde behouden.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        while chunk := list(islice(lines, CHUNK_LINES)):
+            pending.append(ex.submit(parse_chunk, chunk, ncols, nullify_neg9999))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
 def main():
     ap = argparse.ArgumentParser(description="Import KNMI etmgeg_*.txt naar SQLite.")
     ap.add_argument("input_txt", help="Pad naar KNMI TXT (evt. .gz).")
@@ -52,68 +113,59 @@ def main():
     ap.add_argument("--drop-table", action="store_true", help="Bestaande tabel droppen als die bestaat.")
     ap.add_argument("--nullify-neg9999", action="store_true", help="Zet -9999 om naar NULL.")
     ap.add_argument("--no-index", action="store_true", help="Sla indexen aanmaken over.")
-    ap.add_argument("--batch", type=int, default=5000, help="Batchgrootte voor inserts.")
+    ap.add_argument("--batch", type=int, default=5000, help="Voortgangsmelding per zoveel rijen.")
+    ap.add_argument("--workers", type=int, default=1, help="Aantal processen voor het parsen (0 = alle cores).")
     args = ap.parse_args()
 
-    # Lees alle regels (we moeten eerst de header vinden)
+    # Stream het bestand: header zoeken en daarna dezelfde handle doorlezen voor de data
     with open_text(args.input_txt) as f:
-        lines = f.readlines()
-
-    header_cols, data_start = detect_header_and_data_start(lines)
-    columns = [sanitize(c) for c in header_cols]
-
-    # Bepaal simpele types: STN → INTEGER, YYYYMMDD → TEXT, rest → INTEGER (KNMI daily is meestal int in tienden)
-    col_defs = []
-    for c in columns:
-        if c.upper() == "STN":
-            col_defs.append(f'"{c}" INTEGER')
-        elif c.upper() == "YYYYMMDD":
-            col_defs.append(f'"{c}" TEXT')
+        header_cols = find_header(f)
+        columns = [sanitize(c) for c in header_cols]
+
+        # Bepaal simpele types: STN → INTEGER, YYYYMMDD → TEXT, rest → INTEGER (KNMI daily is meestal int in tienden)
+        col_defs = [f'"{c}" {"TEXT" if c.upper() == "YYYYMMDD" else "INTEGER"}' for c in columns]
+        insert_sql = f'INSERT INTO "{args.table}" VALUES ({",".join(["?"] * len(columns))});'
+
+        # Maak/prepareer DB (sqlite3.connect maakt het bestand zelf aan); transacties beheren we zelf
+        con = sqlite3.connect(args.output_db, isolation_level=None, cached_statements=256)
+        # Bulk-load: journal alleen in geheugen (ROLLBACK blijft werken), geen fsync; bij een crash importeer je opnieuw
+        con.executescript("""
+            PRAGMA journal_mode=MEMORY;
+            PRAGMA synchronous=OFF;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-200000;
+            PRAGMA locking_mode=EXCLUSIVE;
+        """)
+        cur = con.cursor()
+
+        # Insert data: één executemany over een generator, zonder tussentijdse batch-lijsten
+        workers = args.workers or os.cpu_count() or 1
+        if workers > 1:
+            rows = iter_rows_parallel(f, len(columns), args.nullify_neg9999, workers)
         else:
-            col_defs.append(f'"{c}" INTEGER')
-
-    # Maak/prepareer DB
-    if not os.path.exists(args.output_db):
-        open(args.output_db, "wb").close()
-    con = sqlite3.connect(args.output_db)
-    cur = con.cursor()
-
-    if args.drop_table:
-        cur.execute(f'DROP TABLE IF EXISTS "{args.table}";')
+            rows = iter_rows(f, len(columns), CellParser(args.nullify_neg9999).__getitem__)
 
-    cur.execute(f'CREATE TABLE IF NOT EXISTS "{args.table}" ({", ".join(col_defs)});')
-    con.commit()
+        def with_progress(rows):
+            for n, row in enumerate(rows, 1):
+                yield row
+                if n % args.batch == 0:
+                    print(f"Ingevoegd: {n} rijen...", flush=True)
 
-    # Insert data
-    placeholders = ",".join(["?"] * len(columns))
-    batch = []
-    total = 0
-
-    for line in lines[data_start:]:
-        if not line.strip() or line.lstrip().startswith("#"):
-            continue
-        row = next(csv.reader([line], delimiter=","))
-        # trim/pad naar kolomlengte
-        row = [x.strip() for x in row]
-        if len(row) < len(columns):
-            row += [""] * (len(columns) - len(row))
-        elif len(row) > len(columns):
-            row = row[:len(columns)]
-
-        parsed = [parse_value(cell, args.nullify_neg9999) for cell in row]
-        batch.append(parsed)
-        if len(batch) >= args.batch:
-            cur.executemany(f'INSERT INTO "{args.table}" VALUES ({placeholders});', batch)
-            con.commit()
-            total += len(batch)
-            batch.clear()
-            print(f"Ingevoegd: {total} rijen...", flush=True)
-
-    if batch:
-        cur.executemany(f'INSERT INTO "{args.table}" VALUES ({placeholders});', batch)
-        con.commit()
-        total += len(batch)
-        batch.clear()
+        # Eén transactie voor tabel + hele ingest i.p.v. een commit per batch; bij een fout niets half achterlaten
+        cur.execute("BEGIN")
+        try:
+            if args.drop_table:
+                cur.execute(f'DROP TABLE IF EXISTS "{args.table}";')
+
+            cur.execute(f'CREATE TABLE IF NOT EXISTS "{args.table}" ({", ".join(col_defs)});')
+            cur.executemany(insert_sql, with_progress(rows))
+            total = cur.rowcount
+            cur.execute("COMMIT")
+        except BaseException:
+            if con.in_transaction:
+                cur.execute("ROLLBACK")
+            con.close()
+            raise
 
     print(f"Klaar. Totaal ingevoegd: {total} rijen in tabel {args.table}.")
 
@@ -121,13 +173,21 @@ def main():
     if not args.no_index:
         try:
             # Index op STN en datum (indien aanwezig)
+            cur.execute("BEGIN")
             if "STN" in columns:
                 cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{args.table}_stn ON "{args.table}" (STN);')
             if "YYYYMMDD" in columns:
                 cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{args.table}_date ON "{args.table}" (YYYYMMDD);')
-            con.commit()
+                # Covering index: datumfilters op temperatuur lezen alleen de index, nooit de brede rij
+                if {"TG", "TN", "TX"} <= set(columns):
+                    cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{args.table}_date_temp ON "{args.table}" (YYYYMMDD, TG, TN, TX);')
+            cur.execute("COMMIT")
+            # Statistieken voor de query planner; de servers openen de DB read-only en doen dit dus niet zelf
+            cur.execute("ANALYZE")
             print("Indexen aangemaakt.")
         except Exception as e:
+            if con.in_transaction:
+                cur.execute("ROLLBACK")
             print(f"Kon indexen niet aanmaken: {e}", file=sys.stderr)
 
     con.close()
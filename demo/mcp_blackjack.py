@@ -1,14 +1,16 @@
 # blackjack_mcp.py
 # Blackjack MCP-server (STDIO) met state, dealer-reveal fix en correcte blackjack payout (3:2).
 # Start:
-#   uv tool install "mcp[cli]" pydantic   (of: uvx pip install "mcp[cli]" pydantic)
+#   uv tool install "mcp[cli]" pydantic numpy   (of: uvx pip install "mcp[cli]" pydantic numpy)
 #   uvx mcp dev blackjack_mcp.py
 # Of direct:
 #   python blackjack_mcp.py
 
-import random
-from typing import List, Optional, Tuple
-from pydantic import BaseModel, Field, conint
+from array import array
+from functools import lru_cache
+from typing import Annotated, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("blackjack")
@@ -19,50 +21,57 @@ mcp = FastMCP("blackjack")
 SUITS = ["♠", "♥", "♦", "♣"]
 RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
 
-def build_shoe(num_decks: int) -> List[str]:
-    deck = [f"{r}{s}" for r in RANKS for s in SUITS]
-    shoe = deck * num_decks
-    random.shuffle(shoe)
-    return shoe
+# Kaarten zijn ints 0..51 (rank-index * 4 + suit-index); alleen naar tekst bij tonen aan de client
+_CARD_STR = [f"{r}{s}" for r in RANKS for s in SUITS]
+_DECK = np.arange(len(_CARD_STR), dtype=np.uint8)
+_RNG = np.random.default_rng()
 
-def hand_value(cards: List[str]) -> Tuple[int, bool]:
-    """Return (best_value, is_soft). Aces kunnen 1 of 11 zijn."""
-    values = []
-    aces = 0
-    for c in cards:
-        r = c[:-1] or c[0]  # "10" vs "A"
-        if r in ["J", "Q", "K"]:
-            v = 10
-        elif r == "A":
-            v = 11
-            aces += 1
-        else:
-            v = int(r)
-        values.append(v)
-    total = sum(values)
-    # Verlaag A's van 11 naar 1 indien bust
-    while total > 21 and aces > 0:
-        total -= 10
-        aces -= 1
+def card_str(cards: List[int]) -> List[str]:
+    return [_CARD_STR[c] for c in cards]
+
+def build_shoe(num_decks: int) -> array:
+    return array("B", _RNG.permutation(np.tile(_DECK, num_decks)).tobytes())
+
+def shuffle_in_place(shoe: array, start: int = 0):
+    # Schud shoe[start:] direct in de bytes van de array (NumPy-view, geen kopie)
+    _RNG.shuffle(np.frombuffer(shoe, dtype=np.uint8)[start:])
+
+# Waarde per rank (A telt eerst als 11), en daarmee direct per kaart-int
+_RANK_VALUE = {"A": 11, "J": 10, "Q": 10, "K": 10, **{str(i): i for i in range(2, 11)}}
+_CARD_VALUE = array("B", [_RANK_VALUE[r] for r in RANKS for _ in SUITS])
+_ACE = _RANK_VALUE["A"]
+
+def _values(cards: List[int]) -> Tuple[int, ...]:
+    return tuple(_CARD_VALUE[c] for c in cards)
+
+@lru_cache(maxsize=4096)
+def _hand_value_values(values: Tuple[int, ...]) -> Tuple[int, bool]:
+    base = sum(values)
+    aces = values.count(_ACE)
+    # Zoveel A's van 11 naar 1 als nodig om niet bust te gaan
+    reducible = min(aces, max(0, (base - 21 + 9) // 10))
     # soft = er telt nog minstens één A als 11
-    soft = aces > 0
-    return total, soft
+    return base - 10 * reducible, aces > reducible
 
-def is_blackjack(cards: List[str]) -> bool:
+def hand_value(cards: List[int]) -> Tuple[int, bool]:
+    """Return (best_value, is_soft). Aces kunnen 1 of 11 zijn."""
+    return _hand_value_values(_values(cards))
+
+def is_blackjack(cards: List[int]) -> bool:
     if len(cards) != 2:
         return False
-    val, _ = hand_value(cards)
-    ranks = {cards[0][:-1] or cards[0][0], cards[1][:-1] or cards[1][0]}
-    return val == 21 and ("A" in ranks)
+    values = _values(cards)
+    val, _ = _hand_value_values(values)
+    return val == 21 and _ACE in values
 
 # ----------------------------
 # Config & State
 # ----------------------------
 class GameConfig(BaseModel):
-    starting_credits: conint(ge=0) = Field(50, description="Starttegoed")
-    num_decks: conint(ge=1, le=8) = Field(4, description="Aantal decks in de shoe")
-    bj_pay_n: conint(ge=1) = Field(3, description="Blackjack payout numerator (3)")
-    bj_pay_d: conint(ge=1) = Field(2, description="Blackjack payout denominator (2)")
+    starting_credits: Annotated[int, Field(ge=0, description="Starttegoed")] = 50
+    num_decks: Annotated[int, Field(ge=1, le=8, description="Aantal decks in de shoe")] = 4
+    bj_pay_n: Annotated[int, Field(ge=1, description="Blackjack payout numerator (3)")] = 3
+    bj_pay_d: Annotated[int, Field(ge=1, description="Blackjack payout denominator (2)")] = 2
     dealer_hits_soft_17: bool = Field(False, description="Dealer hit op soft 17 (False=stand)")
 
 class RoundResult(BaseModel):
@@ -70,38 +79,42 @@ class RoundResult(BaseModel):
     payout: int = 0  # netto verandering voor speler (exclusief teruggegeven inzet bij push)
 
 class GameState(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     credits: int = 0
     current_bet: int = 0
-    shoe: List[str] = Field(default_factory=list)
-    discard: List[str] = Field(default_factory=list)
-    player_hand: List[str] = Field(default_factory=list)
-    dealer_hand: List[str] = Field(default_factory=list)  # [0]=upcard, [1]=hole
+    # Vaste shoe + cursor: shoe[shoe_pos:] is nog te delen, shoe[:shoe_pos] zit in handen of discard
+    shoe: array = Field(default_factory=lambda: array("B"))
+    shoe_pos: int = 0
+    discard: List[int] = Field(default_factory=list)
+    player_hand: List[int] = Field(default_factory=list)
+    dealer_hand: List[int] = Field(default_factory=list)  # [0]=upcard, [1]=hole
     in_round: bool = False
     can_double: bool = False
     config: GameConfig = Field(default_factory=GameConfig)
     last_result: Optional[RoundResult] = None
 
     # Nieuw: definitieve handen van de laatst afgerekende ronde, voor reveal
-    last_final_player_hand: List[str] = Field(default_factory=list)
-    last_final_dealer_hand: List[str] = Field(default_factory=list)
+    last_final_player_hand: List[int] = Field(default_factory=list)
+    last_final_dealer_hand: List[int] = Field(default_factory=list)
 
     @property
     def dealer_upcard(self) -> Optional[str]:
-        return self.dealer_hand[0] if self.dealer_hand else None
+        return _CARD_STR[self.dealer_hand[0]] if self.dealer_hand else None
 
     def visible_state(self) -> dict:
         # Tijdens ronde: toon upcard + verborgen hole
         if self.in_round:
-            visible_dealer = self.dealer_hand[:1] + (["🂠"] if len(self.dealer_hand) >= 2 else [])
-            player = self.player_hand
+            visible_dealer = card_str(self.dealer_hand[:1]) + (["🂠"] if len(self.dealer_hand) >= 2 else [])
+            player = card_str(self.player_hand)
         else:
             # Na ronde: toon de gerevealde, definitieve handen (indien aanwezig)
             if self.last_result and self.last_final_dealer_hand:
-                visible_dealer = self.last_final_dealer_hand
-                player = self.last_final_player_hand
+                visible_dealer = card_str(self.last_final_dealer_hand)
+                player = card_str(self.last_final_player_hand)
             else:
-                visible_dealer = self.dealer_hand
-                player = self.player_hand
+                visible_dealer = card_str(self.dealer_hand)
+                player = card_str(self.player_hand)
 
         return {
             "credits": self.credits,
@@ -110,9 +123,9 @@ class GameState(BaseModel):
             "dealer_hand": visible_dealer,
             "in_round": self.in_round,
             "can_double": self.can_double,
-            "config": self.config.dict(),  # of .model_dump() bij pydantic v2
-            "last_result": self.last_result.dict() if self.last_result else None,
-            "shoe_remaining": len(self.shoe),
+            "config": self.config.model_dump(),
+            "last_result": self.last_result.model_dump() if self.last_result else None,
+            "shoe_remaining": len(self.shoe) - self.shoe_pos,
             "discard_count": len(self.discard),
         }
 
@@ -125,10 +138,10 @@ class InitGameInput(GameConfig):
     pass
 
 class AddCreditsInput(BaseModel):
-    amount: conint(gt=0) = Field(..., description="Credits toevoegen (>0)")
+    amount: Annotated[int, Field(gt=0, description="Credits toevoegen (>0)")]
 
 class PlaceBetInput(BaseModel):
-    amount: conint(gt=0) = Field(..., description="Inzet (>0)")
+    amount: Annotated[int, Field(gt=0, description="Inzet (>0)")]
 
 class ActionResult(BaseModel):
     state: dict
@@ -139,16 +152,24 @@ class ActionResult(BaseModel):
 # ----------------------------
 def ensure_shoe():
     # Als de shoe te klein wordt, schud bij met discard of bouw nieuwe shoe
-    if len(STATE.shoe) < 15:
-        STATE.shoe += STATE.discard
-        STATE.discard = []
-        random.shuffle(STATE.shoe)
-        if not STATE.shoe:
+    shoe, pos = STATE.shoe, STATE.shoe_pos
+    if len(shoe) - pos < 15:
+        # Herschik het gedeelde deel in-place: kaarten in handen vooraan, daarachter de discard,
+        # en schud discard + resterende shoe samen. Geen nieuwe shoe-allocatie.
+        in_hand = STATE.player_hand + STATE.dealer_hand
+        start = len(in_hand)
+        shoe[:pos] = array("B", in_hand + STATE.discard)
+        STATE.discard.clear()
+        shuffle_in_place(shoe, start)
+        STATE.shoe_pos = start
+        if STATE.shoe_pos >= len(shoe):
             STATE.shoe = build_shoe(STATE.config.num_decks)
+            STATE.shoe_pos = 0
 
-def deal_card(to: List[str]):
+def deal_card(to: List[int]):
     ensure_shoe()
-    card = STATE.shoe.pop()
+    card = STATE.shoe[STATE.shoe_pos]
+    STATE.shoe_pos += 1
     to.append(card)
 
 def settle_round_with_payout(result: RoundResult) -> RoundResult:
@@ -159,15 +180,15 @@ def settle_round(reason: str) -> RoundResult:
     """Sluit ronde af, onthoud definitieve handen voor reveal, gooi daarna naar discard."""
     result = STATE.last_result or RoundResult(outcome=reason, payout=0)
 
-    # Sla definitieve handen op vóór we ze legen (reveal werkt hierdoor correct)
-    STATE.last_final_player_hand = STATE.player_hand.copy()
-    STATE.last_final_dealer_hand = STATE.dealer_hand.copy()
+    # Geef de handen zelf door als definitieve handen (reveal) en start met lege handen; geen kopie nodig
+    STATE.last_final_player_hand = STATE.player_hand
+    STATE.last_final_dealer_hand = STATE.dealer_hand
+    STATE.player_hand = []
+    STATE.dealer_hand = []
 
     # Kaarten naar discard + ronde sluiten
-    STATE.discard.extend(STATE.player_hand)
-    STATE.discard.extend(STATE.dealer_hand)
-    STATE.player_hand.clear()
-    STATE.dealer_hand.clear()
+    STATE.discard.extend(STATE.last_final_player_hand)
+    STATE.discard.extend(STATE.last_final_dealer_hand)
     STATE.current_bet = 0
     STATE.in_round = False
     STATE.can_double = False
@@ -176,18 +197,22 @@ def settle_round(reason: str) -> RoundResult:
 
 def dealer_play():
     """Dealer speelt; standaard stand op 17 inclusief soft (tenzij dealer_hits_soft_17=True)."""
+    hits_soft = STATE.config.dealer_hits_soft_17
+    dh = STATE.dealer_hand
     while True:
-        total, soft = hand_value(STATE.dealer_hand)
+        total, soft = hand_value(dh)
         if total < 17:
-            deal_card(STATE.dealer_hand)
+            deal_card(dh)
             continue
-        if total == 17 and soft and STATE.config.dealer_hits_soft_17:
-            deal_card(STATE.dealer_hand)
+        if total == 17 and soft and hits_soft:
+            deal_card(dh)
             continue
         break
 
 def resolve_outcome(initial_check: bool = False) -> RoundResult:
     """Bepaalt resultaat. Bij initial_check: check blackjacks; anders normale afronding."""
+    cfg = STATE.config
+    n, d = cfg.bj_pay_n, cfg.bj_pay_d
     bet = STATE.current_bet
     player_total, _ = hand_value(STATE.player_hand)
     dealer_total, _ = hand_value(STATE.dealer_hand)
@@ -204,7 +229,7 @@ def resolve_outcome(initial_check: bool = False) -> RoundResult:
 
         if player_bj:
             # Blackjack betaalt 3:2 (standaard) — netto winst = 1.5 * bet
-            profit = (STATE.config.bj_pay_n * bet) // STATE.config.bj_pay_d
+            profit = (n * bet) // d
             STATE.credits += bet + profit  # inzet + winst
             result = RoundResult(outcome="player_blackjack", payout=profit)
             return settle_round_with_payout(result)
@@ -253,7 +278,7 @@ def init_game(data: InitGameInput) -> ActionResult:
         credits=data.starting_credits,
         shoe=build_shoe(data.num_decks),
         discard=[],
-        config=GameConfig(**data.dict()),
+        config=GameConfig(**data.model_dump()),
     )
     # reset reveal
     STATE.last_result = None
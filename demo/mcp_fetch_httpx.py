@@ -2,26 +2,221 @@
 FastMCP — fetch external page via httpx and convert HTML to Markdown
 
 Usage:
-  uv pip install httpx markdownify
+  uv pip install httpx
   uv run examples/mcp_fetch_httpx.py
 
 Call:
   name: fetch_markdown, arguments: {"url": "https://example.com", "max_chars": 3000}
 """
+import re
+from html.parser import HTMLParser
+
 from fastmcp import FastMCP
 import httpx
-from markdownify import markdownify as md
 
 app = FastMCP(name="fetch-md-httpx", version="0.1.0")
 
+# Gedeelde async client: keep-alive verbindingen blijven tussen calls hergebruikt
+_ACLIENT = httpx.AsyncClient(
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+)
 
-@app.tool()
-def fetch_markdown(url: str, timeout_sec: float = 15.0, max_chars: int = 4000) -> dict:
-    with httpx.Client(follow_redirects=True, timeout=timeout_sec) as client:
-        resp = client.get(url)
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+# Tags die in <head> thuishoren; elke andere start-tag sluit de head impliciet (HTML5: </head> is optioneel)
+_HEAD_TAGS = {"title", "meta", "link", "base", "style", "script", "noscript", "template"}
+_BLOCK_TAGS = {"p", "div", "section", "article", "header", "footer", "main", "nav",
+               "ul", "ol", "dl", "table", "pre"}
+_INLINE_MARKS = {"strong": "**", "b": "**", "em": "*", "i": "*", "code": "`"}
+_WS = re.compile(r"\s+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def _is_blank_quote(line: str) -> bool:
+    return line.startswith(">") and not line.replace(">", "").strip()
+
+
+class _MarkdownEmitter(HTMLParser):
+    """Minimale HTML→Markdown: koppen, alinea's, lijsten, tabellen, citaten, links en nadruk; de rest wordt platte tekst."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: list[str] = []
+        # Aantal zichtbare tekens (tekst zonder witruimte): de opgeschoonde Markdown is nooit korter,
+        # dus size > max_chars betekent zeker afkappen. Lege layout-wrappers tellen zo niet mee.
+        self.size = 0
+        self._skip = 0
+        self._in_head = False
+        self._hrefs: list[str | None] = []
+        self._lists: list[list] = []  # per open ul/ol: [tag, teller]
+        self._quote = 0
+        # Tabelstatus; </td> en </tr> zijn in HTML optioneel, dus cellen/rijen ook impliciet sluiten
+        self._cell_open = False
+        self._row_open = False
+        self._row_cells = 0
+        self._table_rows = 0
+
+    def _emit(self, text: str):
+        if self._quote and "\n" in text:
+            text = text.replace("\n", "\n" + "> " * self._quote)
+        self.out.append(text)
+
+    def _close_cell(self):
+        if self._cell_open:
+            self._emit("|" if self.out[-1].endswith(" ") else " |")
+            self._cell_open = False
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row_open:
+            if not self._table_rows:
+                # Eerste rij als kop, zoals markdownify: anders herkent Markdown het niet als tabel
+                self._emit("\n|" + " --- |" * self._row_cells)
+            self._table_rows += 1
+            self._row_open = False
+
+    def _open_row(self):
+        self._close_row()
+        self._emit("\n|")
+        self._row_open = True
+        self._row_cells = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "head":
+            self._in_head = True
+            return
+        if self._in_head and tag not in _HEAD_TAGS:
+            self._in_head = False
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif self._skip or self._in_head:
+            return
+        elif self._cell_open and (tag in _BLOCK_TAGS or tag in ("br", "li", "dt", "dd")):
+            if not self.out[-1].endswith(" "):
+                self._emit(" ")  # cel moet op één regel blijven
+        elif len(tag) == 2 and tag[0] == "h" and tag[1] in "123456":
+            self._emit("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag == "li":
+            if self._lists and self._lists[-1][0] == "ol":
+                self._lists[-1][1] += 1
+                self._emit(f"\n{self._lists[-1][1]}. ")
+            else:
+                self._emit("\n- ")
+        elif tag == "dt":
+            self._emit("\n")
+        elif tag == "dd":
+            self._emit("\n: ")
+        elif tag == "br":
+            self._emit("\n")
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            self._hrefs.append(href)
+            if href:
+                self._emit("[")
+        elif tag in _INLINE_MARKS:
+            self._emit(_INLINE_MARKS[tag])
+        elif tag == "tr":
+            self._open_row()
+        elif tag in ("td", "th"):
+            self._close_cell()
+            if not self._row_open:
+                self._open_row()
+            self._emit(" ")
+            self._cell_open = True
+            self._row_cells += 1
+        elif tag == "blockquote":
+            self._quote += 1
+            self._emit("\n\n")
+        elif tag in _BLOCK_TAGS:
+            if tag in ("ul", "ol"):
+                self._lists.append([tag, 0])
+            elif tag == "table":
+                self._close_row()
+                self._table_rows = 0
+            self._emit("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._in_head = False
+        elif tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif self._skip or self._in_head:
+            return
+        elif tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "table":
+            self._close_row()
+            self._table_rows = 0
+            self._emit("\n\n")
+        elif self._cell_open and tag in _BLOCK_TAGS:
+            return
+        elif len(tag) == 2 and tag[0] == "h" and tag[1] in "123456":
+            self._emit("\n\n")
+        elif tag == "a":
+            href = self._hrefs.pop() if self._hrefs else None
+            if href:
+                self._emit(f"]({href})")
+        elif tag in _INLINE_MARKS:
+            self._emit(_INLINE_MARKS[tag])
+        elif tag == "blockquote":
+            self._quote = max(0, self._quote - 1)
+            self._emit("\n\n")
+        elif tag in _BLOCK_TAGS:
+            if tag in ("ul", "ol") and self._lists:
+                self._lists.pop()
+            self._emit("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip and not self._in_head:
+            text = _WS.sub(" ", data)
+            if self._row_open:
+                # binnen een tabelrij: opmaak-witruimte tussen tags en dubbele spaties in cellen weglaten
+                if not self._cell_open or self.out[-1].endswith(" "):
+                    text = text.lstrip()
+                if not text:
+                    return
+                text = text.replace("|", "\\|")
+            self.size += len(text) - text.count(" ")
+            self._emit(text)
+
+    def markdown(self) -> str:
+        self._close_row()
+        lines = [line.strip() for line in "".join(self.out).split("\n")]
+        kept = []
+        for i, line in enumerate(lines):
+            # lege citaatregels ('>', '> >') alleen houden als scheiding tussen twee gevulde citaatregels
+            if _is_blank_quote(line):
+                prev = kept[-1] if kept else ""
+                j = i + 1
+                while j < len(lines) and _is_blank_quote(lines[j]):
+                    j += 1
+                nxt = lines[j] if j < len(lines) else ""
+                if not prev.startswith(">") or _is_blank_quote(prev) or not nxt.startswith(">"):
+                    continue
+            kept.append(line)
+        return _BLANK_LINES.sub("\n\n", "\n".join(kept)).strip()
+
+
+async def _fetch_markdown_prefix(url: str, timeout_sec: float, max_chars: int) -> tuple[str, bool]:
+    """Stream + converteer de pagina en stop zodra er genoeg Markdown is. Retourneert (tekst, volledig)."""
+    parser = _MarkdownEmitter()
+    async with _ACLIENT.stream("GET", url, timeout=timeout_sec) as resp:
         resp.raise_for_status()
-        text = md(resp.text)
-    if len(text) > max_chars:
+        async for chunk in resp.aiter_text():
+            parser.feed(chunk)
+            if parser.size > max_chars:
+                return parser.markdown(), False
+    parser.close()
+    return parser.markdown(), True
+
+
+@app.tool()
+async def fetch_markdown(url: str, timeout_sec: float = 15.0, max_chars: int = 4000) -> dict:
+    # Staart wordt toch afgekapt: download en converteer niet meer dan nodig
+    text, complete = await _fetch_markdown_prefix(url, timeout_sec, max_chars)
+    if len(text) > max_chars or not complete:
         text = text[:max_chars] + "\n\n[...afgekapt voor demo...]\n"
     return {"content": [{"type": "text", "text": text}]}
 
@@ -1,15 +1,61 @@
+import asyncio
+import time
+
 import httpx
 from fastmcp import FastMCP
 
+try:  # orjson is optioneel: sneller op grote CoverageJSON-payloads
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 # KNMI API configuratie
 API_KEY = "eyJvcmciOiI1ZTU1NGUxOTI3NGE5NjAwMDEyYTNlYjEiLCJpZCI6IjMwZmU0ZWVjNjJkODQzOWRiZTMyZGNlZjAzNWNhNDVmIiwiaCI6Im11cm11cjEyOCJ9"
 BASE_URL = "https://api.dataplatform.knmi.nl/edr/v1"
 
+# Eén async client voor alle tools: connection pooling/keep-alive i.p.v. een nieuwe TLS-handshake per call,
+# en async zodat FastMCP meerdere requests tegelijk kan laten lopen
+_ACLIENT = httpx.AsyncClient(
+    base_url=BASE_URL,
+    headers={"Authorization": API_KEY},
+    timeout=15.0,
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+)
+
+# Kleine TTL-cache: collecties/locaties zijn vrijwel statisch, weerdata kan nog bijgewerkt worden
+META_TTL = 3600.0
+DATA_TTL = 300.0
+_CACHE_MAX = 128
+_CACHE: dict[tuple, tuple[float, dict]] = {}
+
+async def _get_json(path: str, params: dict | None = None, ttl: float = META_TTL) -> dict:
+    key = (path, tuple(sorted((params or {}).items())))
+    hit = _CACHE.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+
+    response = await _ACLIENT.get(path, params=params)
+    data = _json_loads(response.content)
+    if response.is_success:  # foutantwoorden niet cachen
+        _CACHE.pop(key, None)
+        if len(_CACHE) >= _CACHE_MAX:
+            _CACHE.pop(next(iter(_CACHE)))  # oudste entry eruit
+        _CACHE[key] = (time.monotonic() + ttl, data)
+    return data
+
+async def _weather_data(collection_id: str, location_id: str, datetime_range: str, parameter_name: str) -> dict:
+    params = {
+        "datetime": datetime_range,
+        "parameter-name": parameter_name,
+        "f": "CoverageJSON"
+    }
+    return await _get_json(f"/collections/{collection_id}/locations/{location_id}", params, ttl=DATA_TTL)
+
 # Maak een simpele MCP server
 mcp = FastMCP("knmi-weather")
 
 @mcp.tool()
-def get_collections() -> dict:
+async def get_collections() -> dict:
     """Haal alle beschikbare KNMI weather collections op
     
     Beschikbare collecties:
@@ -22,11 +68,10 @@ def get_collections() -> dict:
     - 'EV24_grid': Verdamping grid data (1951-heden)
     - 'WINS50': Wind data voor energie (2019-2021)
     """
-    response = httpx.get(f"{BASE_URL}/collections", headers={"Authorization": API_KEY})
-    return response.json()
+    return await _get_json("/collections")
 
 @mcp.tool()
-def get_locations(collection_id: str = "daily-in-situ-meteorological-observations-validated") -> dict:
+async def get_locations(collection_id: str = "daily-in-situ-meteorological-observations-validated") -> dict:
     """Haal alle weerstation locaties op voor een collectie
     
     Args:
@@ -47,11 +92,10 @@ def get_locations(collection_id: str = "daily-in-situ-meteorological-observation
     - '06310': Vlissingen
     - '06330': Hoek van Holland
     """
-    response = httpx.get(f"{BASE_URL}/collections/{collection_id}/locations", headers={"Authorization": API_KEY})
-    return response.json()
+    return await _get_json(f"/collections/{collection_id}/locations")
 
 @mcp.tool()
-def get_weather_data(
+async def get_weather_data(
     collection_id: str = "daily-in-situ-meteorological-observations-validated",
     location_id: str = "06380",  # Maastricht
     datetime_range: str = "2000-01-01/2025-01-01",
@@ -109,17 +153,29 @@ def get_weather_data(
     
     NOTA: Temperatuur en neerslag waarden zijn * 10 (deel door 10 voor echte waarde)
     """
-    params = {
-        "datetime": datetime_range,
-        "parameter-name": parameter_name,
-        "f": "CoverageJSON"
-    }
-    response = httpx.get(
-        f"{BASE_URL}/collections/{collection_id}/locations/{location_id}",
-        headers={"Authorization": API_KEY},
-        params=params
+    return await _weather_data(collection_id, location_id, datetime_range, parameter_name)
+
+@mcp.tool()
+async def get_weather_data_batch(
+    location_ids: list[str],
+    collection_id: str = "daily-in-situ-meteorological-observations-validated",
+    datetime_range: str = "2000-01-01/2025-01-01",
+    parameter_name: str = "TG"
+) -> dict:
+    """Haal weerdata op voor meerdere stations tegelijk (parallelle requests)
+
+    Args:
+        location_ids: Lijst met station IDs, bijv. ["06260", "06380"] (zie get_locations)
+        collection_id: Collectie ID (zie get_collections)
+        datetime_range: Datumbereik "YYYY-MM-DD/YYYY-MM-DD"
+        parameter_name: Parameter code (zie get_weather_data voor de lijst)
+
+    Retourneert: { location_id: CoverageJSON, ... }
+    """
+    results = await asyncio.gather(
+        *(_weather_data(collection_id, lid, datetime_range, parameter_name) for lid in location_ids)
     )
-    return response.json()
+    return dict(zip(location_ids, results))
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
@@ -1,35 +1,159 @@
 # server.py
-import base64, io, sqlite3, time
+import functools, hashlib, io, re, sqlite3, threading, time
+from collections import OrderedDict
 from pydantic import Field
 from typing import Optional, Dict, Any, Annotated
 
-import matplotlib
+import numpy as np
 from fastmcp import FastMCP
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # headless
+from matplotlib.figure import Figure
 
-matplotlib.use("Agg")            # headless
-import matplotlib.pyplot as plt  # geen kleuren instellen -> LLM-vriendelijk
+try:  # pybase64 is optioneel: SIMD-base64, sneller op grote PNG's (levert direct een str)
+    from pybase64 import b64encode_as_string as _b64encode_str
+except ImportError:
+    from base64 import b64encode as _b64encode
 
-mcp = FastMCP("db-tools")
+    def _b64encode_str(data) -> str:
+        return _b64encode(data).decode("ascii")
+
+try:  # orjson is optioneel: snellere JSON-tekst voor grote query-resultaten
+    from orjson import dumps as _json_dumps
+
+    def _tool_serializer(data) -> str:
+        return _json_dumps(data, default=str).decode()
+except ImportError:
+    _tool_serializer = None  # FastMCP-standaard (pydantic_core)
+
+mcp = FastMCP("db-tools", tool_serializer=_tool_serializer)
+
+# Eén herbruikbare figuur (geen pyplot-state, geen nieuwe canvas per call); Figures zijn niet thread-safe
+_FIG = Figure(figsize=(8, 4.5), dpi=150)
+_CANVAS = FigureCanvasAgg(_FIG)
+_AX = _FIG.add_subplot(111)
+_SUBPLOT_DEFAULTS = vars(_FIG.subplotpars).copy()
+_FIG_LOCK = threading.Lock()
 
 # Demo DB
-conn = sqlite3.connect("data/knmi_etmgeg_320.sqlite", check_same_thread=False)
-conn.row_factory = sqlite3.Row
+DB_PATH = "data/knmi_etmgeg_320.sqlite"
+# Alleen SELECTs: DB gemapt in geheugen, ruime page cache en schrijven geblokkeerd
+_CONN_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-131072;
+    PRAGMA query_only=1;
+"""
+
+def _load_temperature_columns() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Datum + TG/TN/TX één keer als kolom-arrays (gesorteerd op datum, NULL → NaN) in het geheugen."""
+    c = sqlite3.connect(DB_PATH)
+    try:
+        rows = c.execute("SELECT YYYYMMDD, TG, TN, TX FROM etmgeg_320 ORDER BY YYYYMMDD").fetchall()
+    finally:
+        c.close()
+    dates, tg, tn, tx = zip(*rows) if rows else ((), (), (), ())
+    return (np.array(dates, dtype="U8"), np.array(tg, dtype=np.float64),
+            np.array(tn, dtype=np.float64), np.array(tx, dtype=np.float64))
+
+_DATES, _TG, _TN, _TX = _load_temperature_columns()
+_tls = threading.local()
+
 ALLOWED_TABLES = {"etmgeg_320"}
 MAX_LIMIT = 1000
 DEFAULT_LIMIT = 200
 
+# Whitelist via SQLite zelf: de authorizer ziet elke gelezen tabel, ook "gequote", [bracketed] of comma-joins
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+class _NotWhitelisted(Exception):
+    pass
+
+def _authorize(action: int, arg1: Optional[str], arg2: Optional[str], db_name: Optional[str], trigger: Optional[str]) -> int:
+    if action == sqlite3.SQLITE_READ:
+        ok = arg1 is not None and arg1.lower() in ALLOWED_TABLES
+    else:
+        ok = action in _ALLOWED_ACTIONS
+    if ok:
+        return sqlite3.SQLITE_OK
+    _tls.denied = True
+    return sqlite3.SQLITE_DENY
+
+def _get_conn() -> sqlite3.Connection:
+    """Eén connectie per thread, zodat gelijktijdige tool-calls niet op één connectie-mutex wachten."""
+    conn = getattr(_tls, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.executescript(_CONN_PRAGMAS)
+        conn.set_authorizer(_authorize)  # na de PRAGMA's: die zouden anders zelf geweigerd worden
+        _tls.conn = conn
+    return conn
+
+def _execute(sql: str) -> sqlite3.Cursor:
+    """Voer SQL uit op de thread-connectie; weigering door de authorizer wordt _NotWhitelisted."""
+    _tls.denied = False
+    try:
+        return _get_conn().execute(sql)
+    except sqlite3.DatabaseError as e:
+        if _tls.denied:
+            raise _NotWhitelisted("Query references non-whitelisted tables.") from e
+        raise
+
+_SELECT_RE = re.compile(r"^\s*select\b", re.I)
+
 def _is_safe_select(sql: str) -> bool:
-    s = sql.strip().lower()
-    return s.startswith("select") and "pragma" not in s and ";" not in s
+    return bool(_SELECT_RE.match(sql)) and ";" not in sql and "pragma" not in sql.casefold()
+
+def _column_array(values: tuple) -> np.ndarray:
+    # Numeriek → float64 (NULL → NaN), zodat Matplotlib direct een ndarray krijgt; anders object (bv. datum-tekst)
+    if all(v is None or isinstance(v, (int, float)) for v in values):
+        return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=len(values))
+    return np.fromiter(values, dtype=object, count=len(values))
 
 def _enforce_limit(sql: str, limit: int) -> str:
     return sql if " limit " in sql.lower() else f"{sql}\nLIMIT {limit}"
 
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+@functools.lru_cache(maxsize=256)
+def _select_columns(sql: str) -> tuple[str, ...]:
+    """Kolomnamen van een SELECT zonder rijen op te halen (LIMIT 0); de demo-DB is read-only."""
+    cur = _execute(f"SELECT * FROM (\n{sql}\n) LIMIT 0")
+    return tuple(d[0] for d in cur.description)
+
+def _build_query(sql: str, limit: int, offset: int) -> tuple[Optional[str], Optional[str]]:
+    """Valideer en herschrijf een query. Retourneert (query, fout)."""
+    if not _is_safe_select(sql):
+        return None, "Only read-only SELECT statements are allowed."
+
+    # Tabel-whitelist: afgedwongen door de authorizer bij het uitvoeren
+    q = _enforce_limit(sql, limit)
+    if offset and " offset " not in q.lower():
+        q = f"{q} OFFSET {offset}"
+    return q, None
+
+def _run_query(q: str) -> tuple[list, list[tuple]]:
+    """Voer een gevalideerde query uit; rijen blijven de tuples van SQLite (JSON maakt er toch arrays van)."""
+    cur = _execute(q)
+    rows = cur.fetchall()
+    cols = [d[0] for d in cur.description] if cur.description else []
+    return cols, rows
+
+# De demo-DB is read-only: complete tool-antwoorden mogen gecachet blijven (LRU)
+_QCACHE: "OrderedDict[bytes, dict]" = OrderedDict()
+_QCACHE_MAX = 512
+_QCACHE_LOCK = threading.Lock()
+def _cache_key(sql: str, limit: int, offset: int, columnar: bool) -> bytes:
+    # Exacte SQL-tekst: witruimte normaliseren is niet veilig (een newline sluit bv. een `--`-commentaar af)
+    return hashlib.blake2b(f"{sql}|{limit}|{offset}|{columnar:d}".encode(), digest_size=16).digest()
+
 @mcp.tool()
 def query_knmi_noordzee_weerstation(
         sql: Annotated[str, Field(description="Read-only SELECT SQL query")],
         limit: Annotated[int, Field(description="Maximum number of rows to return", ge=1, le=MAX_LIMIT)] = DEFAULT_LIMIT,
-        offset: Annotated[int, Field(description="Row offset for pagination", ge=0)] = 0
+        offset: Annotated[int, Field(description="Row offset for pagination", ge=0)] = 0,
+        columnar: Annotated[bool, Field(description="Return one value list per column ('data') instead of rows")] = False
 ) -> dict:
     """
     Voer een read-only SELECT uit op de tabel `etmgeg_320` met dagelijkse meteorologische metingen
@@ -90,35 +214,41 @@ def query_knmi_noordzee_weerstation(
     Retourneert een JSON-object met:
     - columns: lijst van kolomnamen
     - rows: lijst van rijen (waarden)
+    - data: (alleen bij columnar=true, in plaats van rows) lijst met per kolom de waarden
     - row_count: aantal geretourneerde rijen
     - truncated: true als de query door LIMIT afgekapt is
     - elapsed_ms: tijd in milliseconden die de query duurde
     """
     start = time.time()
-    if not _is_safe_select(sql):
-        return {"error": "Only read-only SELECT statements are allowed."}
-
-    # (Eenvoudige check; voor productie liever SQL parser gebruiken)
-    lowered = sql.lower()
-    if " from " in lowered and not any(f" {t} " in lowered for t in ALLOWED_TABLES):
-        return {"error": "Query references non-whitelisted tables."}
-
     limit = min(max(1, int(limit)), MAX_LIMIT)
-    q = _enforce_limit(sql, limit)
-    if offset and " offset " not in q.lower():
-        q = f"{q} OFFSET {int(offset)}"
+    offset = int(offset)
+    key = _cache_key(sql, limit, offset, columnar)
+    with _QCACHE_LOCK:
+        result = _QCACHE.get(key)
+        if result is not None:
+            _QCACHE.move_to_end(key)
+    if result is None:
+        q, error = _build_query(sql, limit, offset)
+        if error:
+            return {"error": error}
 
-    cur = conn.execute(q)
-    rows = cur.fetchall()
-    cols = [d[0] for d in cur.description] if cur.description else []
-    data = [[r[c] for c in cols] for r in rows]
-    return {
-        "columns": cols,
-        "rows": data,
-        "row_count": len(data),
-        "truncated": len(data) >= limit,
-        "elapsed_ms": int((time.time() - start) * 1000),
-    }
+        try:
+            cols, rows = _run_query(q)
+        except _NotWhitelisted as e:
+            return {"error": str(e)}
+        result = {"columns": cols}
+        if columnar:
+            # kolom-layout (SoA): compacter in JSON en direct bruikbaar als array per kolom
+            result["data"] = [list(c) for c in zip(*rows)] if rows else [[] for _ in cols]
+        else:
+            result["rows"] = rows
+        result["row_count"] = len(rows)
+        result["truncated"] = len(rows) >= limit
+        with _QCACHE_LOCK:
+            _QCACHE[key] = result
+            if len(_QCACHE) > _QCACHE_MAX:
+                _QCACHE.popitem(last=False)
+    return {**result, "elapsed_ms": int((time.time() - start) * 1000)}
 
 @mcp.tool()
 def line_chart_sql(
@@ -135,44 +265,48 @@ def line_chart_sql(
       x_col="ym", y_col="t_c", title="Gem. dagtemp (°C) per maand"
     Richtlijnen:
     - Alle **waarden in tienden** (zoals TG, TX, TN) eerst delen door 10 om °C/mm/hPa te krijgen.
-    - Alleen **SELECT**; LIMIT wordt afgedwongen (max ~5000 rijen).
+    - Alleen **SELECT**; LIMIT wordt afgedwongen (max 1000 rijen).
     Retourneert: { "image_base64": "...", "mime": "image/png", "width": int, "height": int, "row_count": int, "elapsed_ms": int }
     """
     if not _is_safe_select(sql):
         return {"error": "Only read-only SELECT statements are allowed."}
 
-    sql_q = _enforce_limit(sql, MAX_LIMIT)
-
     t0 = time.time()
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(sql_q)
+    # kolommen vooraf controleren: een onbekende "naam" zou SQLite anders stil als string-literal lezen
+    try:
+        cols = _select_columns(sql)
+    except _NotWhitelisted as e:
+        return {"error": str(e)}
+    if x_col not in cols or y_col not in cols:
+        return {"error": f"Columns not in result. Available: {list(cols)}"}
+
+    # alleen de twee benodigde kolommen over de C→Python-grens halen
+    sql_q = f"SELECT {_quote_ident(x_col)}, {_quote_ident(y_col)} FROM (\n{sql}\n) LIMIT {MAX_LIMIT}"
+    cur = _execute(sql_q)
     rows = cur.fetchall()
     if not rows:
         return {"error": "Query returned no rows."}
 
-    # haal kolommen
-    cols = [d[0] for d in cur.description]  # type: ignore
-    if x_col not in cols or y_col not in cols:
-        return {"error": f"Columns not in result. Available: {cols}"}
-
-    x = [r[x_col] for r in rows]
-    y = [r[y_col] for r in rows]
+    xs, ys = zip(*rows)
+    x = _column_array(xs)
+    y = _column_array(ys)
 
     # eenvoudige plot
-    fig = plt.figure(figsize=(8, 4.5), dpi=150)
-    ax = plt.gca()
-    ax.plot(x, y)              # geen kleuren instellen
-    ax.set_xlabel(x_col)
-    ax.set_ylabel(y_col)
-    if title:
-        ax.set_title(title)
-    fig.tight_layout()
-
-    # naar PNG (base64)
     buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    img_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+    with _FIG_LOCK:
+        _AX.clear()
+        _FIG.subplots_adjust(**_SUBPLOT_DEFAULTS)  # tight_layout elke keer vanaf dezelfde uitgangspositie
+        _AX.plot(x, y)             # geen kleuren instellen -> LLM-vriendelijk
+        _AX.set_xlabel(x_col)
+        _AX.set_ylabel(y_col)
+        if title:
+            _AX.set_title(title)
+        _FIG.tight_layout()
+
+        # naar PNG (base64)
+        _FIG.savefig(buf, format="png", pil_kwargs={"compress_level": 1})  # zlib-niveau 1: iets groter, veel sneller
+    with buf.getbuffer() as png:  # memoryview: geen kopie van de PNG-bytes
+        img_b64 = _b64encode_str(png)
 
     return {
         "image_base64": img_b64,
@@ -196,25 +330,21 @@ def summarize_temperature(
     if end_date < start_date:
         return {"error": "end_date must be greater than or equal to start_date."}
 
-    query = """
-            SELECT AVG(TG)/10.0 AS avg_temp_c,
-                   MIN(TN)/10.0 AS min_temp_c,
-                   MAX(TX)/10.0 AS max_temp_c
-            FROM etmgeg_320
-            WHERE YYYYMMDD BETWEEN ? AND ? \
-            """
-
+    # De dagen liggen gesorteerd in geheugen: bereik opzoeken (binary search) en over contiguë slices reduceren
     t0 = time.time()
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(query, (start_date, end_date))
-    row = cur.fetchone()
-    if not row or row["avg_temp_c"] is None:
+    lo = int(np.searchsorted(_DATES, start_date, side="left"))
+    hi = int(np.searchsorted(_DATES, end_date, side="right"))
+    tg, tn, tx = _TG[lo:hi], _TN[lo:hi], _TX[lo:hi]
+    tg = tg[~np.isnan(tg)]
+    if not tg.size:
         return {"error": "No data for specified date range."}
 
+    tn = tn[~np.isnan(tn)]
+    tx = tx[~np.isnan(tx)]
     return {
-        "avg_temp_c": row["avg_temp_c"],
-        "min_temp_c": row["min_temp_c"],
-        "max_temp_c": row["max_temp_c"],
+        "avg_temp_c": float(tg.sum()) / tg.size / 10.0,  # hele getallen in float64: som is exact, net als SQLite AVG
+        "min_temp_c": float(tn.min()) / 10.0 if tn.size else None,
+        "max_temp_c": float(tx.max()) / 10.0 if tx.size else None,
         "elapsed_ms": int((time.time() - t0) * 1000),
     }
 
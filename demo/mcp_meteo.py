@@ -1,14 +1,56 @@
+import time
+from pathlib import Path
+
 import httpx
 import yaml
 from fastmcp import FastMCP
 
+SPEC_URL = "https://raw.githubusercontent.com/open-meteo/open-meteo/main/openapi.yml"
+# De spec verandert zelden: lokaal bewaren, na een dag revalideren met ETag (304 = kopie nog goed)
+SPEC_CACHE = Path("~/.cache/mcp_meteo/openapi.yml").expanduser()
+SPEC_ETAG = SPEC_CACHE.with_suffix(".etag")
+SPEC_TTL = 24 * 3600
+
+# C-loader van libyaml als die beschikbaar is (veel sneller), anders de pure-Python SafeLoader
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def _load_spec_text() -> str:
+    cached = SPEC_CACHE.read_text(encoding="utf-8") if SPEC_CACHE.exists() else None
+    if cached is not None and time.time() - SPEC_CACHE.stat().st_mtime < SPEC_TTL:
+        return cached
+
+    headers = {}
+    if cached is not None and SPEC_ETAG.exists():
+        headers["If-None-Match"] = SPEC_ETAG.read_text(encoding="utf-8").strip()
+    try:
+        response = httpx.get(SPEC_URL, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            SPEC_CACHE.touch()  # TTL opnieuw laten ingaan
+            return cached
+        response.raise_for_status()
+    except httpx.HTTPError:
+        if cached is not None:
+            return cached  # offline of storing: verlopen kopie is beter dan niet starten
+        raise
+
+    text = response.text
+    try:
+        SPEC_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = SPEC_CACHE.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(SPEC_CACHE)  # atomair: nooit een half geschreven spec in de cache
+        if etag := response.headers.get("ETag"):
+            SPEC_ETAG.write_text(etag, encoding="utf-8")
+    except OSError:
+        pass  # cache is optioneel (bv. read-only home)
+    return text
+
 # From OpenAPI spec
-response = httpx.get("https://raw.githubusercontent.com/open-meteo/open-meteo/main/openapi.yml")
-spec = yaml.safe_load(response.text)
+spec = yaml.load(_load_spec_text(), Loader=_YAML_LOADER)
 mcp = FastMCP.from_openapi(
     openapi_spec=spec,
     client=httpx.AsyncClient(base_url='https://api.open-meteo.com')
 )
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    mcp.run()
@@ -12,25 +12,21 @@ mcp = FastMCP("slot-machine")
 # ----------------------------
 # Game config
 # ----------------------------
-SYMBOLS = ["◻️", "◻️", "◻️", "🍒", "🍋", "🍊", "🍇", "💎"]
+SYMBOLS = ("◻️", "◻️", "◻️", "🍒", "🍋", "🍊", "🍇", "💎")
 SPIN_COST = 2  # kosten per spin (credits)
+MAX_BULK_SPINS = 1000
+
+# Score zoals in je Swift-voorbeeld: drie gelijke = vaste score, anders 1 per kers-hit
+_SCORES = {
+    ("💎", "💎", "💎"): 100,
+    ("🍒", "🍒", "🍒"): 10,
+    ("🍇", "🍇", "🍇"): 5,
+    ("🍊", "🍊", "🍊"): 3,
+    ("🍋", "🍋", "🍋"): 2,
+}
 
-# Score zoals in je Swift-voorbeeld
 def score_reels(reels: Tuple[str, str, str]) -> int:
-    r1, r2, r3 = reels
-    if (r1, r2, r3) == ("💎", "💎", "💎"):
-        return 100
-    if (r1, r2, r3) == ("🍒", "🍒", "🍒"):
-        return 10
-    if (r1, r2, r3) == ("🍇", "🍇", "🍇"):
-        return 5
-    if (r1, r2, r3) == ("🍊", "🍊", "🍊"):
-        return 3
-    if (r1, r2, r3) == ("🍋", "🍋", "🍋"):
-        return 2
-    if "🍒" in reels:
-        return 1
-    return 0
+    return _SCORES.get(reels, 1 if "🍒" in reels else 0)
 
 # Uitbetaling = score (kan je later tweaken met multiplier)
 def payout_for_score(score: int) -> int:
@@ -57,6 +53,9 @@ class InitGameInput(BaseModel):
 class AddCreditsInput(BaseModel):
     amount: conint(gt=0) = Field(..., description="Aantal credits om toe te voegen (>0)")
 
+class SpinManyInput(BaseModel):
+    count: conint(ge=1, le=MAX_BULK_SPINS) = Field(10, description="Aantal spins (stopt eerder als de credits op zijn)")
+
 class SpinResult(BaseModel):
     reels: Tuple[str, str, str]
     score: int
@@ -74,7 +73,7 @@ def init_game(data: InitGameInput) -> GameState:
     Start een nieuw spel met 'starting_credits'.
     """
     global STATE
-    STATE = GameState(credits=data.starting_credits)
+    STATE = GameState.model_construct(credits=data.starting_credits)  # input is al gevalideerd
     return STATE
 
 @mcp.tool()
@@ -98,40 +97,35 @@ def reset() -> GameState:
     Reset het spel naar 0 credits en leegt de laatste resultaten.
     """
     global STATE
-    STATE = GameState(credits=0)
+    STATE = GameState.model_construct(credits=0)
     return STATE
 
-@mcp.tool()
-def spin() -> SpinResult:
-    """
-    Draai de slotmachine (kost credits) en ontvang eventuele uitbetaling.
-    """
+def _check_credits() -> None:
     if STATE.credits < SPIN_COST:
         # In MCP wil je liever geen exceptions; maar voor duidelijkheid:
         raise ValueError(f"Onvoldoende credits ({STATE.credits}) om te spinnen. Kosten: {SPIN_COST}")
 
-    # Trek kosten af
-    STATE.credits -= SPIN_COST
-    STATE.total_spent += SPIN_COST
-
-    # Spin 3 rollen
-    reels = (random.choice(SYMBOLS), random.choice(SYMBOLS), random.choice(SYMBOLS))
+def _play(reels: Tuple[str, str, str]) -> SpinResult:
+    """Verwerk één spin met gegeven rollen op de globale state."""
     score = score_reels(reels)
     earned = payout_for_score(score)
-
-    # Uitbetaling bijschrijven
-    STATE.credits += earned
-    STATE.total_earned += earned
-    STATE.spins += 1
-
     delta = earned - SPIN_COST
 
-    # Laatste resultaten bewaren
-    STATE.last_reels = reels
-    STATE.last_score = score
-    STATE.last_delta = delta
-
-    return SpinResult(
+    # Kosten aftrekken, uitbetaling bijschrijven en laatste resultaten bewaren in één update
+    # (alle waarden zijn intern berekend: Pydantic-__setattr__ per veld is niet nodig)
+    state = STATE.__dict__
+    state.update({
+        "credits": state["credits"] + delta,
+        "spins": state["spins"] + 1,
+        "total_spent": state["total_spent"] + SPIN_COST,
+        "total_earned": state["total_earned"] + earned,
+        "last_reels": reels,
+        "last_score": score,
+        "last_delta": delta,
+    })
+
+    # Interne, geldige waarden: geen validatie nodig
+    return SpinResult.model_construct(
         reels=reels,
         score=score,
         cost=SPIN_COST,
@@ -140,6 +134,30 @@ def spin() -> SpinResult:
         balance=STATE.credits,
     )
 
+@mcp.tool()
+def spin() -> SpinResult:
+    """
+    Draai de slotmachine (kost credits) en ontvang eventuele uitbetaling.
+    """
+    _check_credits()
+    # Spin 3 rollen
+    return _play(tuple(random.choices(SYMBOLS, k=3)))
+
+@mcp.tool()
+def spin_many(data: SpinManyInput) -> list[SpinResult]:
+    """
+    Draai de slotmachine 'count' keer achter elkaar; stopt zodra de credits niet meer genoeg zijn.
+    """
+    _check_credits()
+    # Alle rollen in één keer trekken (blijft in C), daarna per spin verwerken: winst kan een volgende spin betalen
+    rolls = random.choices(SYMBOLS, k=3 * data.count)
+    results = []
+    for i in range(0, len(rolls), 3):
+        if STATE.credits < SPIN_COST:
+            break
+        results.append(_play((rolls[i], rolls[i + 1], rolls[i + 2])))
+    return results
+
 if __name__ == "__main__":
     # Start een STDIO MCP server
     mcp.run()
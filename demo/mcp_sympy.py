@@ -1,17 +1,32 @@
 from __future__ import annotations
+import functools
 import sympy as sp
 from pydantic import BaseModel
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("math")
 
+# Sympy-expressies zijn immutable: geparste invoer en uitkomsten mogen per string gecachet worden
+@functools.lru_cache(maxsize=1024)
+def _parse(s: str) -> sp.Expr:
+    return sp.sympify(s, evaluate=True)
+
+@functools.lru_cache(maxsize=1024)
+def _simplify(expr: str) -> str:
+    return str(sp.simplify(_parse(expr)))
+
+@functools.lru_cache(maxsize=1024)
+def _solve(equation: str, symbol: str) -> tuple[str, ...]:
+    lhs, _, rhs = equation.partition("=")
+    return tuple(str(s) for s in sp.solve(sp.Eq(_parse(lhs), _parse(rhs)), sp.symbols(symbol)))
+
 @mcp.tool()
 def simplify(expr: str) -> str:
     """
     Vereenvoudig een algebraïsche expressie.
     Voorbeeld: "3x + 5x - 2 + 7"
     """
-    return str(sp.simplify(expr))
+    return _simplify(expr)
 
 class SolveInput(BaseModel):
     equation: str  # bijv "x^2 - 4 = 0"
@@ -23,9 +38,7 @@ def solve(data: SolveInput) -> list[str]:
     Los een vergelijking op naar 'symbol'.
     Voorbeeld: {"equation":"x^2 - 4 = 0", "symbol":"x"}
     """
-    sym = sp.symbols(data.symbol)
-    return [str(s) for s in sp.solve(sp.Eq(sp.sympify(data.equation.split('=')[0]),
-                                           sp.sympify(data.equation.split('=')[1])), sym)]
+    return list(_solve(data.equation, data.symbol))
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
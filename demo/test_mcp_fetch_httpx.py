@@ -0,0 +1,69 @@
+# Regressietests voor de HTML→Markdown-omzetting van fetch_markdown.
+# Draaien vanuit demo/: `uv run --with pytest pytest test_mcp_fetch_httpx.py`
+import asyncio
+
+import httpx
+import pytest
+
+import mcp_fetch_httpx
+from mcp_fetch_httpx import _MarkdownEmitter
+
+
+def to_markdown(html: str) -> str:
+    parser = _MarkdownEmitter()
+    parser.feed(html)
+    parser.close()
+    return parser.markdown()
+
+
+@pytest.mark.parametrize("html, expected", [
+    ("<!doctype html><html><head><title>T</title><body><h1>Kop</h1><p>tekst</p>", "# Kop\n\ntekst"),
+    ("<table><tr><th>Datum</th><th>TG</th></tr><tr><td>20240101</td><td>5.3</td></tr></table>",
+     "| Datum | TG |\n| --- | --- |\n| 20240101 | 5.3 |"),
+    ("<table>\n <tr>\n  <td>a|b</td>\n  <td><p>x</p><p>y</p>\n </tr>\n</table>",
+     "| a\\|b | x y |\n| --- | --- |"),
+    ("<dl><dt>Term</dt><dd>Uitleg</dd></dl>", "Term\n: Uitleg"),
+    ("<ol><li>een</li><li>twee</li></ol>", "1. een\n2. twee"),
+    ("<p>voor</p><blockquote><p>citaat 1</p><p>citaat 2</p></blockquote><p>na</p>",
+     "voor\n\n> citaat 1\n>\n> citaat 2\n\nna"),
+])
+def test_markdown(html, expected):
+    assert to_markdown(html) == expected
+
+
+def fetch_streamed(monkeypatch, page: bytes, max_chars: int) -> str:
+    # pagina gestreamd in blokken van 8 KB, zoals een echte server dat doet
+    async def chunks():
+        for i in range(0, len(page), 8192):
+            yield page[i:i + 8192]
+
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, content=chunks())
+
+    async def fetch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(mcp_fetch_httpx, "_ACLIENT", client)
+            return await mcp_fetch_httpx.fetch_markdown.fn("https://example.test/", max_chars=max_chars)
+
+    return asyncio.run(fetch())["content"][0]["text"]
+
+
+def page_with_paragraphs(n: int) -> bytes:
+    # 500 lege geneste layout-wrappers vóór de eigenlijke inhoud
+    wrappers = "<div><div><span></span></div></div>\n" * 500
+    paragraphs = "".join(f"<p>Alinea {i} met wat tekst over het weer.</p>\n" for i in range(n))
+    return f"<html><body><header>{wrappers}</header><h1>Titel</h1>{paragraphs}</body></html>".encode()
+
+
+def test_layout_wrappers_do_not_trigger_early_stop(monkeypatch):
+    text = fetch_streamed(monkeypatch, page_with_paragraphs(40), max_chars=4000)
+    assert text.startswith("# Titel\n\nAlinea 0 ")
+    assert "Alinea 39 " in text
+    assert "afgekapt" not in text
+
+
+def test_long_page_is_cut_at_max_chars(monkeypatch):
+    text = fetch_streamed(monkeypatch, page_with_paragraphs(5000), max_chars=4000)
+    body, marker = text.split("\n\n[...afgekapt voor demo...]\n")
+    assert len(body) == 4000 and marker == ""
+    assert body.startswith("# Titel\n\nAlinea 0 ")
@@ -0,0 +1,40 @@
+# Regressietests voor de tabel-whitelist van query_knmi_noordzee_weerstation.
+# Draaien vanuit demo/: `uv run --with pytest pytest test_mcp_knmi_local.py`
+import importlib
+import os
+
+import pytest
+
+DEMO_DIR = os.path.dirname(os.path.abspath(__file__))
+NOT_WHITELISTED = {"error": "Query references non-whitelisted tables."}
+
+
+@pytest.fixture(scope="module")
+def query():
+    # DB_PATH is relatief aan demo/; de server opent de DB alleen lezend
+    cwd = os.getcwd()
+    os.chdir(DEMO_DIR)
+    try:
+        server = importlib.import_module("mcp_knmi_local")
+        yield server.query_knmi_noordzee_weerstation.fn
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize("sql", [
+    'select * from "sqlite_master"',
+    "select * from [sqlite_master]",
+    "select name from etmgeg_320, sqlite_master",
+    "select count(*) from sqlite_master",
+])
+def test_non_whitelisted_tables_are_rejected(query, sql):
+    assert query(sql) == NOT_WHITELISTED
+
+
+def test_from_inside_string_literal_is_allowed(query):
+    result = query("SELECT YYYYMMDD FROM etmgeg_320 WHERE YYYYMMDD = 'from x'")
+    assert result["rows"] == []
+
+
+def test_whitelisted_table_without_trailing_space(query):
+    assert query("SELECT count(*) FROM etmgeg_320")["row_count"] == 1
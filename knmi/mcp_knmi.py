@@ -6,6 +6,7 @@ and to demonstrate improvements when adding them later.
 """
 
 import sqlite3
+import threading
 import time
 
 from fastmcp import FastMCP
@@ -16,8 +17,24 @@ mcp = FastMCP("knmi-poc")
 # NOTE: This PoC uses the example SQLite DB shipped in the repo.
 # When running from `workshop/knmi`, this relative path points to it.
 DB_PATH = "./data/knmi_etmgeg_320.sqlite"
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-conn.row_factory = sqlite3.Row
+# Performance-PRAGMAs (mmap, grote page cache). Bewust géén query_only: read-only maken is een opdracht.
+_CONN_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-131072;
+"""
+_tls = threading.local()
+
+
+def _get_conn():
+    """Eén connectie per thread: gelijktijdige tool-calls delen geen connectie-mutex."""
+    conn = getattr(_tls, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.executescript(_CONN_PRAGMAS)
+        _tls.conn = conn
+    return conn
 
 
 @mcp.tool()
@@ -29,10 +46,10 @@ def query_knmi(sql):
     """
     t0 = time.time()
 
-    cur = conn.execute(sql.lower())
+    cur = _get_conn().execute(sql)
     rows = cur.fetchall()
     cols = [d[0] for d in cur.description] if cur.description else []
-    data = [[r[c] for c in cols] for r in rows]
+    data = [list(r) for r in rows]
     return {
         "columns": cols,
         "rows": data,